@@ -9,12 +9,19 @@ NAVER_SECRET_KEY = os.getenv("NAVER_SECRET_KEY", "").strip()
 NAVER_CUSTOMER_ID = os.getenv("NAVER_CUSTOMER_ID", "").strip()
 
 SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL", "").strip()
+SLACK_MAX_ALERTS = int(os.getenv("SLACK_MAX_ALERTS", "50"))
 
 RANK_THRESHOLD = float(os.getenv("RANK_THRESHOLD", "1.5"))
 MIN_IMP = int(os.getenv("MIN_IMP", "30"))
 STREAK_THRESHOLD = int(os.getenv("STREAK_THRESHOLD", "2"))
 
 MAX_IDS_PER_CALL = int(os.getenv("MAX_IDS_PER_CALL", "200"))
+STATS_CONCURRENCY = int(os.getenv("STATS_CONCURRENCY", "8"))
+STATS_RATE_PER_SEC = float(os.getenv("STATS_RATE_PER_SEC", "10"))
+STATS_RATE_BURST = float(os.getenv("STATS_RATE_BURST", "20"))
 HTTP_TIMEOUT = int(os.getenv("HTTP_TIMEOUT", "20"))
 HTTP_RETRY = int(os.getenv("HTTP_RETRY", "3"))
-HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "1.5"))
\ No newline at end of file
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "1.5"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+
+KW_MAP_TTL_SEC = int(os.getenv("KW_MAP_TTL_SEC", "3600"))
\ No newline at end of file
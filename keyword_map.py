@@ -1,50 +1,48 @@
-from typing import Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Tuple
 from utils import ensure_dir, read_json, write_json
 from naver_client import request_json
+from config import KW_MAP_TTL_SEC
 
 CACHE_PATH = "cache/keyword_map.json"
+KW_MAP_WORKERS = 16
 
 def _norm_kw(s: str) -> str:
     return (s or "").strip()
 
 def load_keywords_csv(path: str = "keywords.csv") -> List[str]:
     import csv
-    kws: List[str] = []
-    with open(path, "r", encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        if "keyword" not in reader.fieldnames:
-            raise ValueError("keywords.csv must have 'keyword' column")
-        for row in reader:
-            k = _norm_kw(row.get("keyword"))
-            if k:
-                kws.append(k)
+    import io
+    # 파일을 한 번에 읽어 한 번만 decode한다(줄 단위 decode 비용 제거)
+    with open(path, "rb") as f:
+        text = f.read().decode("utf-8-sig")
+    reader = csv.DictReader(io.StringIO(text, newline=""))
+    if "keyword" not in (reader.fieldnames or []):
+        raise ValueError("keywords.csv must have 'keyword' column")
+    raw_iter = (row.get("keyword") for row in reader)
     # 중복 제거(순서 유지)
-    seen = set()
-    out = []
-    for k in kws:
-        if k in seen:
-            continue
-        seen.add(k)
-        out.append(k)
-    return out
+    return list(dict.fromkeys(filter(None, (_norm_kw(x) for x in raw_iter))))
 
 def load_keywords_txt(path: str = "keywords.txt") -> List[str]:
-    kws: List[str] = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            k = _norm_kw(line)
-            if k:
-                kws.append(k)
-
+    # 파일을 한 번에 읽어 한 번만 decode한다(줄 단위 decode 비용 제거)
+    with open(path, "rb") as f:
+        text = f.read().decode("utf-8")
+    # 실제 줄바꿈(\r\n, \r, \n)에서만 나눈다(splitlines는 \x0c, \u2028 등에서도 나눠버림)
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
     # 중복 제거(순서 유지)
-    seen = set()
-    out = []
-    for k in kws:
-        if k in seen:
-            continue
-        seen.add(k)
-        out.append(k)
-    return out
+    return list(dict.fromkeys(filter(None, (_norm_kw(x) for x in lines))))
+
+def _is_fresh(meta: Any) -> bool:
+    # fetched_at_utc 기준 KW_MAP_TTL_SEC 이내면 캐시를 그대로 쓴다(없거나 깨졌으면 재조회)
+    if not isinstance(meta, dict):
+        return False
+    try:
+        fetched_at = datetime.fromisoformat(meta["fetched_at_utc"])
+        age = (datetime.now(timezone.utc) - fetched_at).total_seconds()
+    except (KeyError, TypeError, ValueError):
+        return False
+    return 0 <= age < KW_MAP_TTL_SEC
 
 def build_keyword_map(force_refresh: bool = False) -> Dict[str, List[Dict[str, Any]]]:
     """
@@ -60,45 +58,54 @@ def build_keyword_map(force_refresh: bool = False) -> Dict[str, List[Dict[str, A
 
     if not force_refresh:
         cached = read_json(CACHE_PATH, default=None)
-        if isinstance(cached, dict) and cached.get("_meta"):
+        if isinstance(cached, dict) and _is_fresh(cached.get("_meta")):
             return cached
 
     # 1) campaigns
     campaigns = request_json("GET", "/ncc/campaigns")
+    cids = [c.get("nccCampaignId") for c in campaigns if c.get("nccCampaignId")]
 
-    kw_map: Dict[str, List[Dict[str, Any]]] = {}
+    def fetch_adgroups(cid: str) -> List[Dict[str, Any]]:
+        return request_json("GET", "/ncc/adgroups", params={"nccCampaignId": cid})
 
-    for c in campaigns:
-        cid = c.get("nccCampaignId")
-        if not cid:
-            continue
+    def fetch_keywords(pair: Tuple[str, str]) -> List[Dict[str, Any]]:
+        _, gid = pair
+        return request_json("GET", "/ncc/keywords", params={"nccAdgroupId": gid})
 
-        # 2) adgroups
-        adgroups = request_json("GET", "/ncc/adgroups", params={"nccCampaignId": cid})
+    kw_map: Dict[str, List[Dict[str, Any]]] = {}
 
-        for g in adgroups:
-            gid = g.get("nccAdgroupId")
-            if not gid:
+    # API 호출은 네트워크 대기가 대부분이라 스레드로 동시에 날린다.
+    # (결과 병합은 메인 스레드에서만 하므로 락 불필요)
+    with ThreadPoolExecutor(max_workers=KW_MAP_WORKERS) as ex:
+        # 2) adgroups (per campaign)
+        adgroups_per_c = list(ex.map(fetch_adgroups, cids))
+
+        pairs: List[Tuple[str, str]] = []
+        for cid, adgroups in zip(cids, adgroups_per_c):
+            for g in adgroups:
+                gid = g.get("nccAdgroupId")
+                if gid:
+                    pairs.append((cid, gid))
+
+        # 3) keywords (per adgroup)
+        keywords_per_g = list(ex.map(fetch_keywords, pairs))
+
+    for (cid, gid), keywords in zip(pairs, keywords_per_g):
+        for kw in keywords:
+            kid = kw.get("nccKeywordId")
+            ktxt = _norm_kw(kw.get("keyword"))
+            if not kid or not ktxt:
                 continue
 
-            # 3) keywords (per adgroup)
-            keywords = request_json("GET", "/ncc/keywords", params={"nccAdgroupId": gid})
-
-            for kw in keywords:
-                kid = kw.get("nccKeywordId")
-                ktxt = _norm_kw(kw.get("keyword"))
-                if not kid or not ktxt:
-                    continue
-
-                kw_map.setdefault(ktxt, []).append({
-                    "id": kid,
-                    "keyword": ktxt,
-                    "adGroupId": gid,
-                    "campaignId": cid,
-                })
+            kw_map.setdefault(ktxt, []).append({
+                "id": kid,
+                "keyword": ktxt,
+                "adGroupId": gid,
+                "campaignId": cid,
+            })
 
     wrapped = {
-        "_meta": {"version": 1},
+        "_meta": {"version": 1, "fetched_at_utc": datetime.now(timezone.utc).isoformat()},
         "map": kw_map
     }
     write_json(CACHE_PATH, wrapped)
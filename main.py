@@ -1,22 +1,39 @@
-import json
+import argparse
 import os
 from datetime import datetime, timezone
-from typing import Dict, Any, List
-from utils import setup_logger
+from typing import Dict, Any, List, Optional, Tuple
+from utils import setup_logger, link_or_copy, json_dumps_bytes
 from keyword_map import load_keywords_txt, build_keyword_map
 from stats_checker import fetch_stats_by_keyword_ids, summarize_by_keyword
-from state_store import load_state, save_state
+from state_store import KeywordState, load_state, save_state
 from slack_notify import send_slack
-from config import RANK_THRESHOLD, MIN_IMP, STREAK_THRESHOLD
+from config import RANK_THRESHOLD, MIN_IMP, STREAK_THRESHOLD, SLACK_MAX_ALERTS
 
 LOGGER = setup_logger()
 
-def is_top_like(imp: float, avg_rnk: float) -> bool:
-    if avg_rnk is None:
-        return False
-    if imp < MIN_IMP:
-        return False
-    return avg_rnk <= RANK_THRESHOLD
+# (kw, has_stats, pc_avgRnk, pc_imp, mobile_avgRnk, mobile_imp)
+RankRecord = Tuple[str, bool, Optional[float], int, Optional[float], int]
+
+
+# Helper: Flatten summary into one record per wanted keyword (shared by snapshot + alert pass)
+def build_rank_records(wanted_keywords: List[str], summary: Dict[str, Any]) -> List[RankRecord]:
+    records: List[RankRecord] = []
+    for kw in wanted_keywords:
+        devs = summary.get(kw)
+        if devs is None:
+            records.append((kw, False, None, 0, None, 0))
+            continue
+        pc = devs.get("PC") or {}
+        mobile = devs.get("MOBILE") or {}
+        records.append((
+            kw,
+            True,
+            pc.get("avgRnk"),
+            int(pc.get("imp") or 0),
+            mobile.get("avgRnk"),
+            int(mobile.get("imp") or 0),
+        ))
+    return records
 
 
 # Helper: Write per-keyword PC/MOBILE rank snapshot for verification
@@ -24,7 +41,7 @@ def write_rank_snapshot(
     *,
     wanted_keywords: List[str],
     kw_map: Dict[str, Any],
-    summary: Dict[str, Any],
+    records: List[RankRecord],
     missing: List[str],
     keyword_ids: List[str],
     rows_received: int,
@@ -41,68 +58,59 @@ def write_rank_snapshot(
     now = datetime.now(timezone.utc)
     ts = now.strftime("%Y%m%d_%H%M%SZ")
 
-    report: Dict[str, Any] = {
-        "_meta": {
-            "generated_at_utc": now.isoformat(),
-            "wanted_keywords": len(wanted_keywords),
-            "in_account_keywords": len(wanted_keywords) - len(missing),
-            "missing_in_account_keywords": len(missing),
-            "keyword_ids_checked": len(keyword_ids),
-            "stats_rows_received": int(rows_received),
-        },
-        "missing_in_account": missing,
-        "keywords": {},
+    meta: Dict[str, Any] = {
+        "generated_at_utc": now.isoformat(),
+        "wanted_keywords": len(wanted_keywords),
+        "in_account_keywords": len(wanted_keywords) - len(missing),
+        "missing_in_account_keywords": len(missing),
+        "keyword_ids_checked": len(keyword_ids),
+        "stats_rows_received": int(rows_received),
     }
 
-    def pick_dev(devs: Dict[str, Any], dev_key: str) -> Dict[str, Any] | None:
-        return devs.get(dev_key) or devs.get(dev_key.lower()) or devs.get(dev_key.upper())
-
-    def pick_imp(d: Dict[str, Any] | None) -> int:
-        if not d:
-            return 0
-        v = d.get("imp")
-        if v is None:
-            v = d.get("impCnt")
-        return int(v or 0)
-
-    # Keep order stable: iterate wanted list order
-    for kw in wanted_keywords:
-        entries = kw_map.get(kw) or []
-        ids = [e.get("id") for e in entries if isinstance(e, dict) and e.get("id")]
-
-        devs = summary.get(kw) or {}
-        pc = pick_dev(devs, "PC")
-        mobile = pick_dev(devs, "MOBILE")
-
-        report["keywords"][kw] = {
-            "in_account": kw not in missing,
-            "ids": ids,
-            "PC": {
-                "avgRnk": None if not pc else pc.get("avgRnk"),
-                "imp": pick_imp(pc),
-            },
-            "MOBILE": {
-                "avgRnk": None if not mobile else mobile.get("avgRnk"),
-                "imp": pick_imp(mobile),
-            },
-        }
-
     latest_path = os.path.join(out_dir, "ranks_latest.json")
     ts_path = os.path.join(out_dir, f"ranks_{ts}.json")
 
-    for path in (latest_path, ts_path):
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+    # 전체 report dict를 메모리에 만들지 않고 키워드 단위로 바로 파일에 쓴다.
+    # (한 줄에 키워드 하나: {"_meta": ..., "missing_in_account": [...], "keywords": {...}})
+    with open(ts_path, "wb") as f:
+        f.write(b'{\n"_meta": ')
+        f.write(json_dumps_bytes(meta, indent=True))
+        f.write(b',\n"missing_in_account": ')
+        f.write(json_dumps_bytes(missing))
+        f.write(b',\n"keywords": {')
+
+        # Keep order stable: records follow wanted list order
+        sep = b"\n"
+        for kw, _, pc_avg, pc_imp, mb_avg, mb_imp in records:
+            entries = kw_map.get(kw) or []
+            ids = [e.get("id") for e in entries if isinstance(e, dict) and e.get("id")]
+
+            entry = {
+                "in_account": bool(entries),
+                "ids": ids,
+                "PC": {"avgRnk": pc_avg, "imp": pc_imp},
+                "MOBILE": {"avgRnk": mb_avg, "imp": mb_imp},
+            }
+            f.write(sep + json_dumps_bytes(kw) + b": " + json_dumps_bytes(entry))
+            sep = b",\n"
+
+        f.write(b"\n}\n}\n")
+    link_or_copy(ts_path, latest_path)
 
     LOGGER.info(f"Wrote rank snapshot JSON: {latest_path} and {ts_path}")
 
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--refresh-keyword-map", action="store_true",
+                    help="ignore cache/keyword_map.json TTL and re-fetch all campaigns/adgroups/keywords")
+    args = ap.parse_args()
+
     # 1) 입력 키워드 로드
     wanted_keywords = load_keywords_txt("keywords.txt")
     LOGGER.info(f"Loaded {len(wanted_keywords)} keywords from keywords.txt")
 
-    # 2) 계정 키워드ID 매핑(캐시)
-    km = build_keyword_map(force_refresh=True)
+    # 2) 계정 키워드ID 매핑(캐시, KW_MAP_TTL_SEC 지나면 재조회)
+    km = build_keyword_map(force_refresh=args.refresh_keyword_map)
     kw_map = km.get("map", {})
     LOGGER.info(f"Keyword map loaded: {len(kw_map)} unique keywords in account cache")
 
@@ -118,7 +126,9 @@ def main():
             continue
         for e in entries:
             kid = e["id"]
-            keyword_ids.append(kid)
+            # 같은 id는 한 번만 조회(로그/스냅샷의 keyword_ids_checked가 실제 호출과 일치하도록)
+            if kid not in id_to_keyword:
+                keyword_ids.append(kid)
             id_to_keyword[kid] = kw
 
     if missing:
@@ -136,6 +146,7 @@ def main():
     LOGGER.info(f"/stats rows received: {rows_received}")
 
     summary = summarize_by_keyword(rows, id_to_keyword)
+    records = build_rank_records(wanted_keywords, summary)
 
     # 4-1) 키워드별 PC/MOBILE avgRnk/imp 스냅샷 JSON 저장 (검증용)
     # - out/ranks_latest.json (덮어쓰기)
@@ -143,7 +154,7 @@ def main():
     write_rank_snapshot(
         wanted_keywords=wanted_keywords,
         kw_map=kw_map,
-        summary=summary,
+        records=records,
         missing=missing,
         keyword_ids=keyword_ids,
         rows_received=rows_received,
@@ -154,40 +165,40 @@ def main():
     state = load_state()
 
     # 6) 연속(2회) 판정 + Slack
+    # Slack에는 최대 SLACK_MAX_ALERTS건만 싣고, 나머지는 건수만 센다.
     alerts = []
+    alert_count = 0
 
-    for kw, devs in summary.items():
-        st = state.setdefault(kw, {
-            "PC": {"streak": 0, "last_avgRnk": None, "last_imp": 0},
-            "MOBILE": {"streak": 0, "last_avgRnk": None, "last_imp": 0},
-        })
+    # 루프 안에서 반복 참조하는 설정값은 지역 변수로 묶어 둔다
+    min_imp = MIN_IMP
+    rank_thr = RANK_THRESHOLD
+    streak_thr = STREAK_THRESHOLD
+    max_alerts = SLACK_MAX_ALERTS
 
-        for dev_key in ["PC", "MOBILE"]:
-            # API가 dev를 "PC"/"MOBILE"이 아닌 형태로 줄 수도 있어
-            dev_data = devs.get(dev_key) or devs.get(dev_key.lower()) or devs.get(dev_key.upper())
-            if not dev_data:
-                continue
-
-            imp = dev_data.get("imp")
-            if imp is None:
-                imp = dev_data.get("impCnt")
-            imp = int(imp or 0)
-            avg = dev_data.get("avgRnk")
+    for kw, has_stats, pc_avg, pc_imp, mb_avg, mb_imp in records:
+        if not has_stats:
+            continue
 
-            top_like = is_top_like(imp, avg)
+        st = state.get(kw)
+        if st is None:
+            st = state[kw] = KeywordState()
 
-            if top_like:
-                st[dev_key]["streak"] = int(st[dev_key]["streak"]) + 1
+        for dev_key, dev_st, avg, imp in (("PC", st.pc, pc_avg, pc_imp), ("MOBILE", st.mobile, mb_avg, mb_imp)):
+            # 상단(1위급) 판정: avgRnk 존재 + 최소 노출 충족 + 기준 순위 이내
+            if avg is not None and imp >= min_imp and avg <= rank_thr:
+                dev_st.streak += 1
             else:
-                st[dev_key]["streak"] = 0
+                dev_st.streak = 0
 
-            st[dev_key]["last_avgRnk"] = avg
-            st[dev_key]["last_imp"] = imp
+            dev_st.last_avgRnk = avg
+            dev_st.last_imp = imp
 
-            if st[dev_key]["streak"] >= STREAK_THRESHOLD:
-                alerts.append((kw, dev_key, st[dev_key]["streak"], avg, imp))
+            if dev_st.streak >= streak_thr:
+                alert_count += 1
+                if len(alerts) < max_alerts:
+                    alerts.append((kw, dev_key, dev_st.streak, avg, imp))
                 # 스팸 방지: 알림 후 streak 리셋(원하면 유지로 바꿀 수 있음)
-                st[dev_key]["streak"] = 0
+                dev_st.streak = 0
 
     # 7) 저장
     save_state(state)
@@ -195,11 +206,11 @@ def main():
     # 8) Slack 전송
     if alerts:
         lines = ["🚨 *네이버 키워드 상단(1위급) 고착 감지* (API avgRnk 기준)"]
-        for kw, dev, streak, avg, imp in alerts[:50]:
+        for kw, dev, streak, avg, imp in alerts:
             lines.append(f"- `{kw}` [{dev}] : streak={streak}, avgRnk={avg}, imp={int(imp)} (기준: avgRnk<={RANK_THRESHOLD}, imp>={MIN_IMP})")
         msg = "\n".join(lines)
         send_slack(msg)
-        LOGGER.info(f"Sent Slack alerts: {len(alerts)}")
+        LOGGER.info(f"Sent Slack alerts: {len(alerts)} (detected: {alert_count})")
     else:
         LOGGER.info("No alerts.")
 
@@ -1,23 +1,34 @@
 import time
 import hmac
+import codecs
 import base64
 import hashlib
 import requests
-import json  # 상단에 없으면 추가
+from requests.adapters import HTTPAdapter
 
 from typing import Dict, Any, Optional, Tuple
 
 from config import (
     NAVER_API_BASE, NAVER_API_KEY, NAVER_SECRET_KEY, NAVER_CUSTOMER_ID,
-    HTTP_TIMEOUT, HTTP_RETRY, HTTP_RETRY_BACKOFF
+    HTTP_TIMEOUT, HTTP_RETRY, HTTP_RETRY_BACKOFF, HTTP_POOL_SIZE
 )
-from utils import jitter_sleep
+from utils import jitter_sleep, json_dumps, json_loads
 
+# 호출마다 TCP/TLS 연결을 새로 맺지 않도록 keep-alive 커넥션 풀을 공유한다.
+# (재시도는 request_json에서 직접 처리하므로 adapter 레벨 재시도는 끈다)
+# pool_maxsize는 동시 worker 수(keyword_map/stats_checker)보다 작으면 커넥션이 버려지므로 HTTP_POOL_SIZE로 조정한다.
+HTTP_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=8, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+HTTP_SESSION.mount("https://", _ADAPTER)
+HTTP_SESSION.mount("http://", _ADAPTER)
 
 
 def _normalize_stats_params(params: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     if not params:
         return params
+    # 이미 모두 문자열이면(stats_checker가 미리 직렬화해서 넘김) 복사/변환할 게 없다
+    if all(isinstance(v, str) for v in params.values()):
+        return params
     p = dict(params)
 
     # ✅ ids: list/tuple -> "id1,id2,id3" 문자열로
@@ -26,11 +37,11 @@ def _normalize_stats_params(params: Optional[Dict[str, Any]]) -> Optional[Dict[s
 
     # ✅ fields: list -> JSON string
     if "fields" in p and isinstance(p["fields"], (list, tuple)):
-        p["fields"] = json.dumps(list(p["fields"]), ensure_ascii=False)
+        p["fields"] = json_dumps(list(p["fields"]))
 
     # ✅ timeRange: dict -> JSON string
     if "timeRange" in p and isinstance(p["timeRange"], dict):
-        p["timeRange"] = json.dumps(p["timeRange"], ensure_ascii=False)
+        p["timeRange"] = json_dumps(p["timeRange"])
 
     # ✅ timeIncrement: int -> str (안전)
     if "timeIncrement" in p and isinstance(p["timeIncrement"], int):
@@ -38,49 +49,57 @@ def _normalize_stats_params(params: Optional[Dict[str, Any]]) -> Optional[Dict[s
 
     return p
 
-def _signature(timestamp_ms: str, method: str, uri: str, secret_key: str) -> str:
+# 요청마다 바뀌지 않는 값은 모듈 로드 시 한 번만 인코딩/조립해 둔다.
+# (HMAC은 키 패딩까지 끝낸 객체를 만들어 두고 요청마다 copy()해서 쓴다)
+_HMAC_PROTO = hmac.new(NAVER_SECRET_KEY.encode("utf-8"), None, hashlib.sha256)
+_STATIC_HEADERS = {
+    "Content-Type": "application/json; charset=UTF-8",
+    "X-API-KEY": NAVER_API_KEY,
+    "X-Customer": str(NAVER_CUSTOMER_ID),
+}
+
+
+def _signature(timestamp_ms: int, method: str, uri: str) -> str:
     # "{timestamp}.{method}.{uri}" -> HMAC-SHA256 -> base64
-    message = f"{timestamp_ms}.{method}.{uri}"
-    digest = hmac.new(
-        secret_key.encode("utf-8"),
-        message.encode("utf-8"),
-        hashlib.sha256
-    ).digest()
-    return base64.b64encode(digest).decode("utf-8")
+    message = b"%d.%s.%s" % (timestamp_ms, method.encode(), uri.encode("utf-8"))
+    h = _HMAC_PROTO.copy()
+    h.update(message)
+    return base64.b64encode(h.digest()).decode("ascii")
 
 
 def _headers(method: str, uri: str) -> Dict[str, str]:
-    ts = str(int(time.time() * 1000))
-    sig = _signature(ts, method.upper(), uri, NAVER_SECRET_KEY)
-    return {
-        "Content-Type": "application/json; charset=UTF-8",
-        "X-Timestamp": ts,
-        "X-API-KEY": NAVER_API_KEY,
-        "X-Customer": str(NAVER_CUSTOMER_ID),
-        "X-Signature": sig,
-    }
+    ts_ms = time.time_ns() // 1_000_000  # 정수 연산만으로 ms 단위 timestamp
+    sig = _signature(ts_ms, method.upper(), uri)
+    headers = dict(_STATIC_HEADERS)
+    headers["X-Timestamp"] = str(ts_ms)
+    headers["X-Signature"] = sig
+    return headers
 
 
 def _safe_parse_response(r: requests.Response) -> Tuple[Any, str]:
     """
     returns: (parsed_obj_or_text_or_none, raw_text_snippet)
     """
-    txt = (r.text or "").strip()
-    snippet = txt[:2000] if txt else ""
-    if not txt:
+    # r.text는 본문 전체를 decode(charset 추정 포함)하므로, JSON이면 bytes를 바로 파싱한다.
+    # (content-type이 애매해도 json 시도)
+    # (orjson은 UTF-8 BOM을 거부하므로 앞에 붙은 BOM은 떼고 파싱)
+    body = r.content or b""
+    if body.startswith(codecs.BOM_UTF8):
+        body = body[len(codecs.BOM_UTF8):]
+    body = body.strip()
+    if not body:
         return None, ""
-    # content-type 힌트가 json이면 json 우선
-    ctype = (r.headers.get("Content-Type") or "").lower()
-    if "json" in ctype:
-        try:
-            return r.json(), snippet
-        except Exception:
-            return txt, snippet
-    # content-type이 애매해도 json 시도
+    snippet = body[:2000].decode("utf-8", errors="replace")
+    try:
+        return json_loads(body), snippet
+    except Exception:
+        pass
+    # UTF-8이 아닌 JSON 등: requests가 decode한 text로 한 번 더 시도
+    txt = (r.text or "").lstrip("\ufeff").strip()
     try:
-        return r.json(), snippet
+        return json_loads(txt), txt[:2000]
     except Exception:
-        return txt, snippet
+        return txt, txt[:2000]
 
 
 def request_json(method: str, uri: str, params: Optional[Dict[str, Any]] = None) -> Any:
@@ -103,9 +122,9 @@ def request_json(method: str, uri: str, params: Optional[Dict[str, Any]] = None)
             if method_u == "GET":
                 if uri == "/stats":
                     params = _normalize_stats_params(params)
-                r = requests.get(url, headers=headers, params=params, timeout=HTTP_TIMEOUT)
+                r = HTTP_SESSION.get(url, headers=headers, params=params, timeout=HTTP_TIMEOUT)
             else:
-                r = requests.request(method_u, url, headers=headers, json=params, timeout=HTTP_TIMEOUT)
+                r = HTTP_SESSION.request(method_u, url, headers=headers, json=params, timeout=HTTP_TIMEOUT)
 
             data, snippet = _safe_parse_response(r)
 
@@ -8,25 +8,34 @@
 #   python rank_report.py --input out/ranks_latest.json --outdir out --min-imp 1 --top 50
 
 import argparse
-import json
+import heapq
 import os
+from bisect import bisect_left
 from datetime import datetime, timezone
+from operator import itemgetter
 from typing import Any, Dict, List, Optional, Tuple
 
+from utils import json_dumps_bytes, json_loads, link_or_copy
+
 
 def utc_ts_compact() -> str:
     return datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%SZ")
 
 
 def load_json(path: str) -> Dict[str, Any]:
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    with open(path, "rb") as f:
+        return json_loads(f.read())
 
 
 def save_json(path: str, obj: Any) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
+    with open(path, "wb") as f:
+        f.write(json_dumps_bytes(obj, indent=True))
+
+
+# bucket upper bounds (inclusive) and their labels; anything above the last edge is "100+"
+_BUCKET_EDGES = (1, 3, 5, 10, 20, 50, 100)
+_BUCKET_LABELS = ("1", "2-3", "4-5", "6-10", "11-20", "21-50", "51-100", "100+")
 
 
 def bucket_rank(avg_rnk: Optional[float]) -> str:
@@ -38,21 +47,12 @@ def bucket_rank(avg_rnk: Optional[float]) -> str:
     except Exception:
         return "invalid"
 
-    if r <= 1:
-        return "1"
-    if r <= 3:
-        return "2-3"
-    if r <= 5:
-        return "4-5"
-    if r <= 10:
-        return "6-10"
-    if r <= 20:
-        return "11-20"
-    if r <= 50:
-        return "21-50"
-    if r <= 100:
-        return "51-100"
-    return "100+"
+    # NaN fails every "r <= edge" test, which put it in "100+" before; bisect would return 0
+    if r != r:
+        return "100+"
+
+    # bisect_left: r == edge stays in that edge's bucket (r <= edge)
+    return _BUCKET_LABELS[bisect_left(_BUCKET_EDGES, r)]
 
 
 def get_dev(d: Dict[str, Any], dev: str) -> Dict[str, Any]:
@@ -118,10 +118,11 @@ def build_report(snapshot: Dict[str, Any], min_imp: int, top_n: int) -> Dict[str
     # Compute per-dev stats
     for dev in devs:
         arr = ranks_for_sort[dev]
-        arr_sorted = sorted(arr, key=lambda x: x[1])  # avg ascending (best first)
-
-        top_items = arr_sorted[:top_n]
-        bot_items = list(reversed(arr_sorted[-top_n:])) if arr_sorted else []
+        # only top/bottom N are needed, so partial-select instead of sorting everything
+        top_items = heapq.nsmallest(top_n, arr, key=itemgetter(1))  # avg ascending (best first)
+        # avg descending (worst first); among equal avg, later rows first
+        # (same order as reversing the tail of a stable ascending sort)
+        bot_items = [item for _, item in heapq.nlargest(top_n, enumerate(arr), key=lambda t: (t[1][1], t[0]))]
 
         top_lists[dev] = [{"keyword": k, "avgRnk": a, "imp": i} for (k, a, i) in top_items]
         bottom_lists[dev] = [{"keyword": k, "avgRnk": a, "imp": i} for (k, a, i) in bot_items]
@@ -173,8 +174,8 @@ def main():
     out_latest = os.path.join(outdir, "report_latest.json")
     out_hist = os.path.join(outdir, f"report_{ts}.json")
 
-    save_json(out_latest, report)
     save_json(out_hist, report)
+    link_or_copy(out_hist, out_latest)
 
     # console summary
     print(f"[OK] wrote: {out_latest}")
@@ -1,7 +1,7 @@
-import requests
 from config import SLACK_WEBHOOK_URL
+from naver_client import HTTP_SESSION
 
 def send_slack(text: str) -> None:
     if not SLACK_WEBHOOK_URL:
         return
-    requests.post(SLACK_WEBHOOK_URL, json={"text": text}, timeout=10)
\ No newline at end of file
+    HTTP_SESSION.post(SLACK_WEBHOOK_URL, json={"text": text}, timeout=10)
\ No newline at end of file
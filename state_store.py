@@ -1,10 +1,48 @@
-from typing import Dict, Any
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional
 from utils import read_json, write_json
 
 STATE_PATH = "state.json"
 
-def load_state() -> Dict[str, Any]:
-    return read_json(STATE_PATH, default={})
+@dataclass(slots=True)
+class DevState:
+    streak: int = 0
+    last_avgRnk: Optional[float] = None
+    last_imp: int = 0
 
-def save_state(state: Dict[str, Any]) -> None:
-    write_json(STATE_PATH, state)
\ No newline at end of file
+    @classmethod
+    def from_dict(cls, d: Any) -> "DevState":
+        if not isinstance(d, dict):
+            return cls()
+        return cls(
+            streak=int(d.get("streak") or 0),
+            last_avgRnk=d.get("last_avgRnk"),
+            last_imp=int(d.get("last_imp") or 0),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"streak": self.streak, "last_avgRnk": self.last_avgRnk, "last_imp": self.last_imp}
+
+@dataclass(slots=True)
+class KeywordState:
+    pc: DevState = field(default_factory=DevState)
+    mobile: DevState = field(default_factory=DevState)
+
+    @classmethod
+    def from_dict(cls, d: Any) -> "KeywordState":
+        if not isinstance(d, dict):
+            return cls()
+        return cls(pc=DevState.from_dict(d.get("PC")), mobile=DevState.from_dict(d.get("MOBILE")))
+
+    def to_dict(self) -> Dict[str, Any]:
+        # state.json 포맷은 기존과 동일하게 {"PC": {...}, "MOBILE": {...}}
+        return {"PC": self.pc.to_dict(), "MOBILE": self.mobile.to_dict()}
+
+def load_state() -> Dict[str, KeywordState]:
+    raw = read_json(STATE_PATH, default={})
+    if not isinstance(raw, dict):
+        return {}
+    return {kw: KeywordState.from_dict(v) for kw, v in raw.items()}
+
+def save_state(state: Dict[str, KeywordState]) -> None:
+    write_json(STATE_PATH, {kw: st.to_dict() for kw, st in state.items()})
\ No newline at end of file
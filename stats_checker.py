@@ -1,10 +1,13 @@
 from typing import Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
-import json
 
 from naver_client import request_json
-from utils import chunked, jitter_sleep
-from config import MAX_IDS_PER_CALL
+from utils import TokenBucket, chunked, json_dumps
+from config import MAX_IDS_PER_CALL, STATS_CONCURRENCY, STATS_RATE_PER_SEC, STATS_RATE_BURST
+
+# 동시 배치 호출 전체에 걸쳐 /stats 호출 속도를 제한한다(예산 안이면 대기 없음)
+_STATS_BUCKET = TokenBucket(STATS_RATE_PER_SEC, STATS_RATE_BURST)
 
 def fetch_stats_by_keyword_ids(keyword_ids: List[str]) -> List[Dict[str, Any]]:
     """
@@ -18,8 +21,11 @@ def fetch_stats_by_keyword_ids(keyword_ids: List[str]) -> List[Dict[str, Any]]:
     Response는 계정/타입에 따라 구조가 달라질 수 있어, 일단 raw list로 받는다.
     """
 
-    # keyword id만 남김
-    keyword_ids = [x for x in keyword_ids if isinstance(x, str) and x.startswith("nkw-")]
+    # keyword id만 남김 + 중복 제거(순서 유지): 중복이 배치를 불려 호출 수가 늘지 않게
+    # (짧은 prefix라 메서드 호출 없는 slice 비교가 startswith보다 싸다)
+    prefix = "nkw-"
+    plen = len(prefix)
+    keyword_ids = list(dict.fromkeys(x for x in keyword_ids if type(x) is str and x[:plen] == prefix))
     if not keyword_ids:
         return []
 
@@ -31,33 +37,33 @@ def fetch_stats_by_keyword_ids(keyword_ids: List[str]) -> List[Dict[str, Any]]:
     # fallback 필드(가장 호환 좋은 최소 조합)
     fields_fallback = ["impCnt", "avgRnk"]
 
-    all_rows: List[Dict[str, Any]] = []
+    # 배치마다 같은 값이라 한 번만 직렬화해 둔다
+    fields_primary_json = json_dumps(fields_primary)
+    fields_fallback_json = json_dumps(fields_fallback)
+    time_range_json = json_dumps(time_range)
 
-    for batch in chunked(keyword_ids, MAX_IDS_PER_CALL):
-        ids_str = ",".join(batch)
+    # 시도 순서: 1) PC/모바일 분해 시도 -> 2) 11001이면 breakdown 없이 최소 필드로 재시도
+    attempts = ((fields_primary_json, True), (fields_fallback_json, False))
 
-        # 1) PC/모바일 분해 시도
-        params = {
-            "ids": ids_str,
-            "fields": json.dumps(fields_primary, ensure_ascii=False),
-            "timeRange": json.dumps(time_range, ensure_ascii=False),
-            "breakdown": "pcMblTp",  # PC/모바일 구분
-        }
+    def _build_params(ids_str: str, fields_json: str, with_breakdown: bool) -> Dict[str, str]:
+        p = {"ids": ids_str, "fields": fields_json, "timeRange": time_range_json}
+        if with_breakdown:
+            p["breakdown"] = "pcMblTp"  # PC/모바일 구분
+        return p
 
-        try:
-            data = request_json("GET", "/stats", params=params)
-        except RuntimeError as e:
-            # 11001 힌트: breakdown/fields 조합이 지원되지 않는 경우가 많아 fallback
-            if "11001" not in str(e):
-                raise
-
-            params2 = {
-                "ids": ids_str,
-                "fields": json.dumps(fields_fallback, ensure_ascii=False),
-                "timeRange": json.dumps(time_range, ensure_ascii=False),
-                # breakdown 없이 재시도
-            }
-            data = request_json("GET", "/stats", params=params2)
+    def _fetch_one_batch(batch: List[str]) -> List[Dict[str, Any]]:
+        ids_str = ",".join(batch)
+
+        for fields_json, with_breakdown in attempts:
+            try:
+                _STATS_BUCKET.acquire()
+                data = request_json("GET", "/stats", params=_build_params(ids_str, fields_json, with_breakdown))
+                break
+            except RuntimeError as e:
+                # 11001 힌트: breakdown/fields 조합이 지원되지 않는 경우가 많아 fallback
+                # (fallback까지 실패했거나 다른 에러면 그대로 올린다)
+                if "11001" not in str(e) or fields_json is fields_fallback_json:
+                    raise
 
         # 응답 정규화: 보통 list이지만 dict로 오는 경우도 있어서 data 키를 우선 확인
         rows: Any
@@ -67,12 +73,17 @@ def fetch_stats_by_keyword_ids(keyword_ids: List[str]) -> List[Dict[str, Any]]:
             rows = data
 
         if isinstance(rows, list):
-            all_rows.extend(rows)
-        else:
-            # 예상 밖이면 그대로 감싸서 남김
-            all_rows.append({"_raw": rows})
+            return rows
+        # 예상 밖이면 그대로 감싸서 남김
+        return [{"_raw": rows}]
 
-        jitter_sleep(0.05, 0.15)
+    # 배치끼리는 독립적인 I/O라 동시에 보낸다. 동시 요청 수는 STATS_CONCURRENCY로 제한되고,
+    # 429가 나면 request_json의 재시도 경로가 처리한다.
+    all_rows: List[Dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=max(1, STATS_CONCURRENCY)) as ex:
+        # ex.map은 모든 배치를 먼저 submit하고, 입력 순서대로 결과를 돌려주므로 row 순서는 기존과 같다
+        for rows in ex.map(_fetch_one_batch, chunked(keyword_ids, MAX_IDS_PER_CALL)):
+            all_rows.extend(rows)
 
     return all_rows
 
@@ -80,6 +91,18 @@ def fetch_stats_by_keyword_ids(keyword_ids: List[str]) -> List[Dict[str, Any]]:
 
 from typing import Dict, Any
 
+# 자주 오는 디바이스명은 정확히 매칭해서 부분 문자열 검사를 건너뛴다.
+_DEV_TABLE = {
+    "PC": "PC",
+    "MOBILE": "MOBILE",
+    "pc": "PC",
+    "mobile": "MOBILE",
+    "모바일": "MOBILE",
+    "desktop": "PC",
+    "데스크탑": "PC",
+    "피씨": "PC",
+}
+
 def summarize_by_keyword(rows, id_to_keyword: Dict[str, str]) -> Dict[str, Any]:
     """
     API /stats rows 예시:
@@ -103,28 +126,37 @@ def summarize_by_keyword(rows, id_to_keyword: Dict[str, str]) -> Dict[str, Any]:
 
     def normalize_dev(name: str):
         n = (name or "").strip().lower()
+        dev = _DEV_TABLE.get(n)
+        if dev:
+            return dev
         if "모바일" in n or "mobile" in n:
             return "MOBILE"
-        if n == "pc" or "desktop" in n or "데스크" in n or "피씨" in n:
+        if "desktop" in n or "데스크" in n or "피씨" in n:
             return "PC"
         return None
 
+    # 행/breakdown마다 반복되는 메서드 조회를 지역 변수로 묶어 둔다
+    kw_of = id_to_keyword.get
+    dev_of = _DEV_TABLE.get
+
     for r in rows or []:
-        kid = r.get("id")
-        kw = id_to_keyword.get(kid)
+        kw = kw_of(r.get("id"))
         if not kw:
             continue
 
-        st = out.setdefault(kw, {
-            "PC": {"avgRnk": None, "imp": 0},
-            "MOBILE": {"avgRnk": None, "imp": 0},
-        })
+        st = out.get(kw)
+        if st is None:
+            st = out[kw] = {
+                "PC": {"avgRnk": None, "imp": 0},
+                "MOBILE": {"avgRnk": None, "imp": 0},
+            }
 
         # breakdowns가 있으면 breakdowns 우선
         bds = r.get("breakdowns") or []
         if bds:
             for b in bds:
-                dev = normalize_dev(b.get("name", ""))
+                name = b.get("name", "")
+                dev = dev_of(name) or normalize_dev(name)
                 if not dev:
                     continue
                 imp = b.get("impCnt")
@@ -134,9 +166,10 @@ def summarize_by_keyword(rows, id_to_keyword: Dict[str, str]) -> Dict[str, Any]:
 
                 # 같은 키워드/디바이스에 여러 row가 올 수 있으면,
                 # 노출이 더 큰 값으로 최신 스냅샷을 대표시키자.
-                if imp > (st[dev].get("imp") or 0):
-                    st[dev]["imp"] = int(imp or 0)
-                    st[dev]["avgRnk"] = avg
+                dev_st = st[dev]
+                if imp > dev_st["imp"]:
+                    dev_st["imp"] = int(imp or 0)
+                    dev_st["avgRnk"] = avg
         else:
             # breakdowns가 없으면 전체 row를 그대로 저장(디바이스 미상)
             # → 일단 모바일/PC에 넣기 애매하니, imp가 있으면 둘 다 채우지 않고 패스
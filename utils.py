@@ -1,44 +1,147 @@
 import os
-import json
 import time
+import queue
+import atexit
+import shutil
 import random
 import logging
-from typing import Any, Dict, List
+import logging.handlers
+import threading
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List
+
+try:
+    import orjson
+except ImportError:  # orjson이 없으면 표준 json으로 동작(느리지만 결과는 동일)
+    orjson = None
+    import json
+
+def json_dumps_bytes(data: Any, indent: bool = False) -> bytes:
+    if orjson is not None:
+        opt = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(data, option=opt)
+    if indent:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def json_dumps(data: Any) -> str:
+    return json_dumps_bytes(data).decode("utf-8")
+
+def json_loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 
 def ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
+@lru_cache(maxsize=1)
 def setup_logger() -> logging.Logger:
-    ensure_dir("logs")
     logger = logging.getLogger("naver_ad_rank_bot2")
+    # 이미 설정돼 있으면 디렉터리/핸들러/포맷터를 다시 만들지 않고 바로 반환
+    if logger.handlers:
+        return logger
+
+    ensure_dir("logs")
     logger.setLevel(logging.INFO)
-    if not logger.handlers:
-        fh = logging.FileHandler("logs/app.log", encoding="utf-8")
-        fmt = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
-        fh.setFormatter(fmt)
-        logger.addHandler(fh)
-        sh = logging.StreamHandler()
-        sh.setFormatter(fmt)
-        logger.addHandler(sh)
+    fmt = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+    fh = logging.FileHandler("logs/app.log", encoding="utf-8")
+    fh.setFormatter(fmt)
+    sh = logging.StreamHandler()
+    sh.setFormatter(fmt)
+
+    # 병렬 worker들이 파일/콘솔 I/O 락에서 줄서지 않도록 로그는 큐에만 넣고,
+    # 실제 기록은 백그라운드 QueueListener 스레드가 한다(종료 시 남은 로그 flush).
+    q = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(q))
+    listener = logging.handlers.QueueListener(q, fh, sh, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    logger.log_listener = listener  # type: ignore[attr-defined]
     return logger
 
-def chunked(lst: List[Any], size: int) -> List[List[Any]]:
-    return [lst[i:i+size] for i in range(0, len(lst), size)]
+def chunked(lst: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    # 배치를 필요할 때 하나씩 만든다(전체 list-of-lists를 미리 만들지 않음)
+    if size < 1:
+        raise ValueError(f"chunk size must be >= 1, got {size}")
+    it = iter(lst)
+    while batch := list(islice(it, size)):
+        yield batch
+
+class TokenBucket:
+    """rate(초당 토큰)로 채워지고 burst까지 쌓이는 토큰 버킷. 스레드 안전.
+
+    예산이 남아 있으면 즉시 통과하고, 모자랄 때만 필요한 만큼 잔다.
+    rate <= 0 이면 제한하지 않는다.
+    """
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.ts = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.ts) * self.rate)
+            self.ts = now
+            self.tokens -= 1
+            # 음수면 앞선 대기자 몫까지 포함해 그만큼 기다린다(락 밖에서 sleep)
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+_tls = threading.local()
+
+def _rng() -> random.Random:
+    # 스레드마다 별도 RNG를 둬서 병렬 호출 시 전역 random 인스턴스를 공유하지 않는다
+    r = getattr(_tls, "rng", None)
+    if r is None:
+        r = _tls.rng = random.Random()
+    return r
 
 def jitter_sleep(base: float = 0.15, spread: float = 0.25) -> None:
-    time.sleep(base + random.random() * spread)
+    time.sleep(base + _rng().random() * spread)
 
 def read_json(path: str, default: Any) -> Any:
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(path, "rb") as f:
+            return json_loads(f.read())
     except FileNotFoundError:
         return default
     except Exception:
         return default
 
 def write_json(path: str, data: Any) -> None:
+    # 한 번에 직렬화 -> write 한 번 + fsync 후 rename (중간에 죽어도 기존 파일은 온전)
+    payload = json_dumps_bytes(data, indent=True)
     tmp = path + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, path)
\ No newline at end of file
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(payload)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)
+
+def link_or_copy(src: str, dst: str) -> None:
+    # 같은 내용을 두 번 직렬화/기록하지 않도록 hardlink로 dst를 교체한다.
+    # (다른 파일시스템이거나 hardlink 미지원이면 복사로 fallback)
+    # 이미 같은 inode면(같은 초에 두 번 실행 등) rename이 no-op이라 tmp만 남으므로 그냥 끝낸다
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+    tmp = dst + ".tmp"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
\ No newline at end of file